@@ -19,6 +19,7 @@ package apply
 
 import (
 	"bytes"
+	"crypto/sha256"
 	"encoding/json"
 	"errors"
 	"fmt"
@@ -27,6 +28,7 @@ import (
 	"path/filepath"
 	"sort"
 	"strings"
+	"sync"
 	"time"
 
 	"github.com/GoogleCloudPlatform/healthcare/deploy/config"
@@ -45,13 +47,26 @@ const (
 // deploymentManagerRoles are the roles granted to the DM service account.
 var deploymentManagerRoles = []string{"owner", "storage.admin"}
 
+// maxConcurrentCommands is the maximum number of independent commands a single step runs at the same time.
+const maxConcurrentCommands = 8
+
+// promptMu serializes interactive prompts to the user.
+var promptMu sync.Mutex
+
 // deploymentRetryWaitTime is the time to wait between retrying a deployment to allow for concurrent operations to finish.
 const deploymentRetryWaitTime = time.Minute
 
+// stackdriverAccountPollDelays are the delays between checks for a newly created Stackdriver account
+// after the user confirmed its creation, before the user is asked again.
+var stackdriverAccountPollDelays = []time.Duration{
+	5 * time.Second, 10 * time.Second, 20 * time.Second, 40 * time.Second, time.Minute,
+}
+
 // The following vars are stubbed in tests.
 var (
 	upsertDeployment = deploymentmanager.Upsert
 	terraformApply   = terraform.Apply
+	sleep            = time.Sleep
 )
 
 // deploymentManagerTyper should be implemented by resources that are natively supported by the deployment manager service.
@@ -75,42 +90,43 @@ type depender interface {
 
 // Default applies project configurations to a default project.
 func Default(conf *config.Config, project *config.Project, opts *Options, rn runner.Runner) error {
-	if err := verifyOrCreateProject(conf, project, rn); err != nil {
-		return fmt.Errorf("failed to verify or create project: %v", err)
+	// Hash the config before any step modifies it.
+	hash, err := configHash(project)
+	if err != nil {
+		return err
 	}
 
-	if err := setupBilling(project, conf.Overall.BillingAccount, rn); err != nil {
-		return fmt.Errorf("failed to set up billing: %v", err)
+	if !opts.SkipSetup {
+		if err := SetupProject(conf, project, rn); err != nil {
+			return err
+		}
 	}
 
-	if err := enableServiceAPIs(project, rn); err != nil {
-		return fmt.Errorf("failed to enable service APIs: %v", err)
-	}
+	existing := newExistingResources(project.ID, rn)
 
-	if err := createCustomComputeImages(project, rn); err != nil {
+	if err := createCustomComputeImages(project, existing, rn); err != nil {
 		return fmt.Errorf("failed to create compute images: %v", err)
 	}
 
-	if err := createDeletionLien(project, rn); err != nil {
+	if err := createDeletionLien(project, existing, rn); err != nil {
 		return fmt.Errorf("failed to create deletion lien: %v", err)
 	}
 
-	if err := createStackdriverAccount(project, rn); err != nil {
-		return fmt.Errorf("failed to create stackdriver account: %v", err)
-	}
-
 	if err := DeployResources(conf, project, rn); err != nil {
 		return fmt.Errorf("failed to deploy resources: %v", err)
 	}
 
-	if err := createAlerts(project, rn); err != nil {
+	if err := createAlerts(project, existing, rn); err != nil {
 		return fmt.Errorf("failed to create alerts: %v", err)
 	}
 
-	if err := collectGCEInfo(project, rn); err != nil {
+	if err := updateGCEInfo(project, hash, rn); err != nil {
 		return fmt.Errorf("failed to collect GCE instances info: %v", err)
 	}
 
+	if opts.SkipForsetiPermissions {
+		return nil
+	}
 	if fsa := conf.AllGeneratedFields.Forseti.ServiceAccount; fsa != "" {
 		workDir, err := terraform.WorkDir(opts.TerraformConfigsPath, project.ID)
 		if err != nil {
@@ -123,6 +139,44 @@ func Default(conf *config.Config, project *config.Project, opts *Options, rn run
 	return nil
 }
 
+// SetupProject creates or verifies the project, sets up its billing and service APIs and makes sure it has a Stackdriver account.
+// These are the first steps of Default and the only ones that may prompt the user,
+// so callers that apply several projects concurrently can run them for each project beforehand.
+func SetupProject(conf *config.Config, project *config.Project, rn runner.Runner) error {
+	if err := verifyOrCreateProject(conf, project, rn); err != nil {
+		return fmt.Errorf("failed to verify or create project: %v", err)
+	}
+
+	if err := setupBilling(project, conf.Overall.BillingAccount, rn); err != nil {
+		return fmt.Errorf("failed to set up billing: %v", err)
+	}
+
+	if err := enableServiceAPIs(project, rn); err != nil {
+		return fmt.Errorf("failed to enable service APIs: %v", err)
+	}
+
+	if err := createStackdriverAccount(project, rn); err != nil {
+		return fmt.Errorf("failed to create stackdriver account: %v", err)
+	}
+	return nil
+}
+
+// configHashVersion is hashed together with the project config.
+// Bump it when a change to this tool affects the GCE instance info cached by the config hash so it is collected again.
+const configHashVersion = "1"
+
+// configHash returns the hex encoded SHA-256 hash of the project config and configHashVersion.
+func configHash(project *config.Project) (string, error) {
+	b, err := json.Marshal(project)
+	if err != nil {
+		return "", fmt.Errorf("failed to marshal project config: %v", err)
+	}
+	h := sha256.New()
+	h.Write([]byte(configHashVersion))
+	h.Write(b)
+	return fmt.Sprintf("%x", h.Sum(nil)), nil
+}
+
 // DeployResources deploys the CFT resources in the project.
 func DeployResources(conf *config.Config, project *config.Project, rn runner.Runner) error {
 	if _, ok := rn.(*runner.Default); ok {
@@ -325,15 +379,38 @@ func getDeployment(project *config.Project, resources []config.Resource) (*deplo
 	return deployment, nil
 }
 
-func removeOwnerUser(project *config.Project, rn runner.Runner) error {
-	cmd := exec.Command("gcloud", "config", "get-value", "account", "--format", "json", "--project", project.ID)
+// authenticatedUsers caches the account gcloud is authenticated as for each runner, as it does not change during a run.
+var authenticatedUsers = struct {
+	sync.Mutex
+	m map[runner.Runner]string
+}{m: make(map[runner.Runner]string)}
+
+// authenticatedUser returns the account gcloud is authenticated as.
+// The account is only queried once per runner so applying many projects does not start gcloud again for each one.
+func authenticatedUser(projectID string, rn runner.Runner) (string, error) {
+	authenticatedUsers.Lock()
+	defer authenticatedUsers.Unlock()
+	if user, ok := authenticatedUsers.m[rn]; ok {
+		return user, nil
+	}
+
+	cmd := exec.Command("gcloud", "config", "get-value", "account", "--format", "json", "--project", projectID)
 	out, err := rn.CmdOutput(cmd)
 	if err != nil {
-		return fmt.Errorf("failed to get currently authenticated user: %v", err)
+		return "", fmt.Errorf("failed to get currently authenticated user: %v", err)
+	}
+	var user string
+	if err := json.Unmarshal(out, &user); err != nil {
+		return "", fmt.Errorf("failed to unmarshal current user: %v", err)
 	}
-	var member string
-	if err := json.Unmarshal(out, &member); err != nil {
-		return fmt.Errorf("failed to unmarshal current user: %v", err)
+	authenticatedUsers.m[rn] = user
+	return user, nil
+}
+
+func removeOwnerUser(project *config.Project, rn runner.Runner) error {
+	member, err := authenticatedUser(project.ID, rn)
+	if err != nil {
+		return err
 	}
 	role := "roles/owner"
 	member = "user:" + member
@@ -370,7 +447,7 @@ func removeOwnerUser(project *config.Project, rn runner.Runner) error {
 		return nil
 	}
 
-	cmd = exec.Command(
+	cmd := exec.Command(
 		"gcloud", "projects", "remove-iam-policy-binding", project.ID,
 		"--member", member, "--role", role, "--project", project.ID)
 	return rn.CmdRun(cmd)
@@ -427,6 +504,31 @@ func deployPrerequisite(project *config.Project, rn runner.Runner) error {
 	return upsertDeployment(setupPrerequisiteDeploymentName, deployment, project.ID, rn)
 }
 
+// updateGCEInfo collects the GCE instance info unless it was collected for a config with the same hash
+// and has the info of every instance in the config, then records the hash.
+// Delete the config_hash generated field to force collecting the info again, e.g. after recreating instances outside of this tool.
+func updateGCEInfo(project *config.Project, hash string, rn runner.Runner) error {
+	if hash == project.GeneratedFields.ConfigHash && hasAllGCEInfo(project) {
+		log.Println("Project config unchanged since GCE instance info was last collected, skipping collection.")
+		return nil
+	}
+	if err := collectGCEInfo(project, rn); err != nil {
+		return err
+	}
+	project.GeneratedFields.ConfigHash = hash
+	return nil
+}
+
+// hasAllGCEInfo returns whether the generated fields have the info of every GCE instance in the project config.
+func hasAllGCEInfo(project *config.Project) bool {
+	for _, i := range project.Resources.GCEInstances {
+		if _, err := project.GeneratedFields.InstanceID(i.Name()); err != nil {
+			return false
+		}
+	}
+	return true
+}
+
 func collectGCEInfo(project *config.Project, rn runner.Runner) error {
 	if len(project.Resources.GCEInstances) == 0 {
 		project.GeneratedFields.GCEInstanceInfoList = nil
@@ -487,13 +589,28 @@ func verifyOrCreateProject(conf *config.Config, project *config.Project, rn runn
 		args = append(args, fmt.Sprintf("--%s", parentType), parentID)
 	}
 
+	// The created project is returned, so its number does not need to be queried separately.
+	args = append(args, "--format", "json")
 	cmd := exec.Command("gcloud", args...)
-	if err := rn.CmdRun(cmd); err != nil {
+	out, err := rn.CmdOutput(cmd)
+	if err != nil {
 		return fmt.Errorf("failed to run project creating command: %v", err)
 	}
-	pnum, err = verifyProject(project.ID, "", parentType, parentID, rn)
-	if err != nil {
-		return fmt.Errorf("failed to verify newly created project: %v", err)
+	var created struct {
+		ProjectNumber string `json:"projectNumber"`
+	}
+	if len(bytes.TrimSpace(out)) != 0 {
+		if err := json.Unmarshal(out, &created); err != nil {
+			return fmt.Errorf("failed to unmarshal created project output: %v", err)
+		}
+	}
+	pnum = created.ProjectNumber
+	if pnum == "" {
+		// Fall back to querying the project if the output did not contain the project number (e.g. in dry runs).
+		pnum, err = verifyProject(project.ID, "", parentType, parentID, rn)
+		if err != nil {
+			return fmt.Errorf("failed to verify newly created project: %v", err)
+		}
 	}
 	project.GeneratedFields.ProjectNumber = pnum
 
@@ -568,6 +685,17 @@ func setupBilling(project *config.Project, defaultBillingAccount string, rn runn
 	return nil
 }
 
+// resourceAPIs are the service APIs required by the project's resources, keyed by API.
+// Each value reports whether the project has resources that need the API.
+var resourceAPIs = map[string]func(*config.Project) bool{
+	"compute.googleapis.com":    func(p *config.Project) bool { return len(p.Resources.GCEInstances) > 0 },
+	"container.googleapis.com":  func(p *config.Project) bool { return len(p.Resources.GKEClusters) > 0 },
+	"healthcare.googleapis.com": func(p *config.Project) bool { return len(p.Resources.CHCDatasets) > 0 },
+	"iam.googleapis.com": func(p *config.Project) bool {
+		return len(p.Resources.IAMPolicies) > 0 || len(p.Resources.IAMCustomRoles) > 0
+	},
+}
+
 // enableServiceAPIs enables service APIs for this project.
 // Use this function instead of enabling private APIs in deployment manager because deployment
 // management does not have all the APIs' access, which might triger PERMISSION_DENIED errors.
@@ -581,17 +709,10 @@ func enableServiceAPIs(project *config.Project, rn runner.Runner) error {
 	m["cloudresourcemanager.googleapis.com"] = true
 
 	// TODO long term solution for updating APIs.
-	if len(project.Resources.GCEInstances) > 0 {
-		m["compute.googleapis.com"] = true
-	}
-	if len(project.Resources.CHCDatasets) > 0 {
-		m["healthcare.googleapis.com"] = true
-	}
-	if len(project.Resources.GKEClusters) > 0 {
-		m["container.googleapis.com"] = true
-	}
-	if len(project.Resources.IAMPolicies) > 0 || len(project.Resources.IAMCustomRoles) > 0 {
-		m["iam.googleapis.com"] = true
+	for api, used := range resourceAPIs {
+		if used(project) {
+			m[api] = true
+		}
 	}
 
 	var wantAPIs []string
@@ -609,70 +730,154 @@ func enableServiceAPIs(project *config.Project, rn runner.Runner) error {
 
 	// Send in batches to avoid hitting quota limits.
 	batchN := 10
+	var batches [][]string
 	for i := 0; i < len(wantAPIs); i += batchN {
-		args := []string{"--project", project.ID, "services", "enable"}
-		args = append(args, wantAPIs[i:min(i+batchN, len(wantAPIs))]...)
-		cmd := exec.Command("gcloud", args...)
-		if err := rn.CmdRun(cmd); err != nil {
-			return fmt.Errorf("failed to enable service APIs: %v", err)
-		}
+		batches = append(batches, wantAPIs[i:min(i+batchN, len(wantAPIs))])
+	}
+
+	// Enabling APIs is slow on the server side and batches do not depend on each other, so send them concurrently.
+	var fns []func() error
+	for _, batch := range batches {
+		batch := batch
+		fns = append(fns, func() error {
+			args := []string{"--project", project.ID, "services", "enable"}
+			args = append(args, batch...)
+			cmd := exec.Command("gcloud", args...)
+			return rn.CmdRun(cmd)
+		})
+	}
+	if err := RunConcurrently(maxConcurrentCommands, false, fns); err != nil {
+		return fmt.Errorf("failed to enable service APIs: %v", err)
 	}
 	return nil
 }
 
+// RunConcurrently calls fns with at most n of them running at the same time.
+// If stopEarly is set, the fns that have not started yet are skipped once a call fails, otherwise all fns are called.
+// If a single call fails its error is returned as is, otherwise the errors of all failed calls are returned together in the order of fns.
+func RunConcurrently(n int, stopEarly bool, fns []func() error) error {
+	if n < 1 {
+		n = 1
+	}
+
+	errs := make([]error, len(fns))
+	var (
+		mu     sync.Mutex
+		failed bool
+		wg     sync.WaitGroup
+	)
+	sem := make(chan struct{}, n)
+	for i, fn := range fns {
+		sem <- struct{}{}
+		mu.Lock()
+		stop := stopEarly && failed
+		mu.Unlock()
+		if stop {
+			<-sem
+			break
+		}
+		wg.Add(1)
+		go func(i int, fn func() error) {
+			defer wg.Done()
+			defer func() { <-sem }()
+			if err := fn(); err != nil {
+				mu.Lock()
+				errs[i] = err
+				failed = true
+				mu.Unlock()
+			}
+		}(i, fn)
+	}
+	wg.Wait()
+
+	var failures []error
+	for _, err := range errs {
+		if err != nil {
+			failures = append(failures, err)
+		}
+	}
+	switch len(failures) {
+	case 0:
+		return nil
+	case 1:
+		return failures[0]
+	}
+	msgs := make([]string, 0, len(failures))
+	for _, err := range failures {
+		msgs = append(msgs, err.Error())
+	}
+	return fmt.Errorf("%d calls failed: %s", len(failures), strings.Join(msgs, "; "))
+}
+
 // createComputeImages creates new custom Compute Engine VM images, if specified.
 // Create VM image using gcloud rather than deployment manager so that the deployment manager
 // service account doesn't need to be granted access to the image GCS bucket.
 // Note: for updates, only new images will be created. Existing images will not be modified.
 // TODO: no longer need this after migrating to Terraform.
-func createCustomComputeImages(project *config.Project, rn runner.Runner) error {
+func createCustomComputeImages(project *config.Project, existing *existingResources, rn runner.Runner) error {
 	if len(project.Resources.GCEInstances) == 0 {
 		log.Println("No GCE images to create.")
 		return nil
 	}
+	var names []string
+	var fns []func() error
+	// Several instances may share a boot image, only create each image once.
+	queued := make(map[string]bool)
 	for _, i := range project.Resources.GCEInstances {
 		if i.CustomBootImage == nil {
 			continue
 		}
+		name, gcsPath := i.CustomBootImage.ImageName, i.CustomBootImage.GCSPath
+		if queued[name] {
+			continue
+		}
 		// Check if custom image already exists.
-		cmd := exec.Command("gcloud", "--project", project.ID, "compute", "images", "list",
-			"--no-standard-images", "--filter", fmt.Sprintf("name=%s", i.CustomBootImage.ImageName), "--format", "value(name)")
-		out, err := rn.CmdOutput(cmd)
+		exists, err := existing.hasImage(name)
 		if err != nil {
-			return fmt.Errorf("failed to check the existence of custom image %q: %v", i.CustomBootImage.ImageName, err)
+			return fmt.Errorf("failed to check the existence of custom image %q: %v", name, err)
 		}
-		if len(bytes.TrimSpace(out)) != 0 {
-			log.Printf("Custom image %q already exists, skipping image creation.", i.CustomBootImage.ImageName)
+		if exists {
+			log.Printf("Custom image %q already exists, skipping image creation.", name)
 			continue
 		}
-		// Create the image.
-		cmd = exec.Command("gcloud", "--project", project.ID, "compute", "images", "create", i.CustomBootImage.ImageName, "--source-uri", fmt.Sprintf("gs://%s", i.CustomBootImage.GCSPath))
-		if err := rn.CmdRun(cmd); err != nil {
-			return fmt.Errorf("failed to create custom image %q: %v", i.CustomBootImage.ImageName, err)
-		}
+		queued[name] = true
+		names = append(names, name)
+		fns = append(fns, func() error {
+			cmd := exec.Command("gcloud", "--project", project.ID, "compute", "images", "create", name, "--source-uri", fmt.Sprintf("gs://%s", gcsPath))
+			if err := rn.CmdRun(cmd); err != nil {
+				return fmt.Errorf("failed to create custom image %q: %v", name, err)
+			}
+			return nil
+		})
+	}
+
+	// Images are independent of each other and slow to create, so create them concurrently.
+	if err := RunConcurrently(maxConcurrentCommands, false, fns); err != nil {
+		return err
+	}
+	for _, name := range names {
+		existing.addImage(name)
 	}
 	return nil
 }
 
 // createDeletionLien create the project deletion lien, if specified.
-func createDeletionLien(project *config.Project, rn runner.Runner) error {
+func createDeletionLien(project *config.Project, existing *existingResources, rn runner.Runner) error {
 	if !project.CreateDeletionLien {
 		return nil
 	}
 
 	defaultLien := "resourcemanager.projects.delete"
-	cmd := exec.Command("gcloud", "--project", project.ID, "alpha", "resource-manager", "liens",
-		"list", "--filter", fmt.Sprintf("restrictions=%s", defaultLien), "--format", "value(restrictions)")
-	out, err := rn.CmdOutput(cmd)
+	exists, err := existing.hasLien(defaultLien)
 	if err != nil {
 		return fmt.Errorf("failed to check existing deletion liens: %v", err)
 	}
-	if len(bytes.TrimSpace(out)) != 0 {
+	if exists {
 		log.Printf("Restriction lien %q already exists, skipping lien creation.", defaultLien)
 		return nil
 	}
 	// Create the lien.
-	cmd = exec.Command("gcloud", "--project", project.ID, "alpha", "resource-manager", "liens",
+	cmd := exec.Command("gcloud", "--project", project.ID, "alpha", "resource-manager", "liens",
 		"create", "--restrictions", defaultLien, "--reason", "Automated project deletion lien deployment.")
 	if err := rn.CmdRun(cmd); err != nil {
 		return fmt.Errorf("failed to create restriction lien %q: %v", defaultLien, err)
@@ -713,6 +918,10 @@ After the account is created, type "yes" to continue, or type "no" to skip the
 creation of Stackdriver account and terminate the deployment.
 ------------------------------------------------------------------------------
 `, project.ID)
+	// Projects may be applied concurrently, so only prompt for one at a time.
+	promptMu.Lock()
+	defer promptMu.Unlock()
+
 	log.Println(message)
 
 	// Keep trying until Stackdriver account is ready, or user skips.
@@ -724,7 +933,7 @@ creation of Stackdriver account and terminate the deployment.
 		if !ok {
 			return errors.New("user skipped the creation of Stackdriver account")
 		}
-		exist, err := stackdriverAccountExists(project.ID, rn)
+		exist, err := waitForStackdriverAccount(project.ID, rn)
 		if err != nil {
 			return err
 		}
@@ -734,7 +943,7 @@ creation of Stackdriver account and terminate the deployment.
 		}
 		log.Println(`
 ------------------------------------------------------------------------------
-The account is not created yet. It can take several minutes for it to be created.
+The account is still not created. It can take several minutes for it to be created.
 
 After the account is created, enter [yes] to continue, or enter [no] to skip the
 creation of Stackdriver account and terminate the deployment.
@@ -744,6 +953,21 @@ creation of Stackdriver account and terminate the deployment.
 	return nil
 }
 
+// waitForStackdriverAccount polls with increasing delays until a Stackdriver account exists in the project.
+// It returns false if the account still does not exist after the last delay.
+func waitForStackdriverAccount(projectID string, rn runner.Runner) (bool, error) {
+	exist, err := stackdriverAccountExists(projectID, rn)
+	for _, d := range stackdriverAccountPollDelays {
+		if err != nil || exist {
+			break
+		}
+		log.Printf("Stackdriver account not found yet, checking again in %v.", d)
+		sleep(d)
+		exist, err = stackdriverAccountExists(projectID, rn)
+	}
+	return exist, err
+}
+
 // stackdriverAccountExists checks whether a Stackdriver account exists in the project.
 func stackdriverAccountExists(projectID string, rn runner.Runner) (bool, error) {
 	cmd := exec.Command("gcloud", "--project", projectID, "alpha", "monitoring", "policies", "list")
@@ -759,55 +983,25 @@ func stackdriverAccountExists(projectID string, rn runner.Runner) (bool, error)
 
 // createAlerts creates Stackdriver alerts for logs-based metrics.
 // TODO: no longer need this after migrating to Terraform.
-func createAlerts(project *config.Project, rn runner.Runner) error {
+func createAlerts(project *config.Project, existing *existingResources, rn runner.Runner) error {
 	if project.StackdriverAlertEmail == "" {
 		log.Println("No Stackdriver alert email specified, skipping creation of Stackdriver alerts.")
 		return nil
 	}
 
-	type labels struct {
-		EmailAddress string `json:"email_address"`
-	}
-
-	type channel struct {
-		Name        string `json:"name"`
-		DisplayName string `json:"displayName"`
-		Type        string `json:"type"`
-		Labels      labels `json:"labels"`
-	}
-
 	// Check channel existence and create if not.
-	cmd := exec.Command("gcloud", "--project", project.ID, "alpha", "monitoring", "channels", "list",
-		"--format", "json")
-
-	out, err := rn.CmdOutput(cmd)
+	chanName, err := existing.emailChannel(project.StackdriverAlertEmail)
 	if err != nil {
-		return fmt.Errorf("failed to list existing monitoring channels: %v", err)
-	}
-
-	var channels []channel
-	if err := json.Unmarshal(out, &channels); err != nil {
-		return fmt.Errorf("failed to unmarshal exist monitoring channels list output: %v", err)
-	}
-
-	var exists bool
-	var chanName string
-	for _, c := range channels {
-		// Assume only one channel exists per email.
-		if c.Labels.EmailAddress == project.StackdriverAlertEmail {
-			exists = true
-			chanName = c.Name
-			break
-		}
+		return err
 	}
-	if exists {
+	if chanName != "" {
 		log.Printf("Stackdriver notification channel already exists for %s.", project.StackdriverAlertEmail)
 	} else {
 		log.Println("Creating Stackdriver notification channel.")
-		newChannel := channel{
+		newChannel := notificationChannel{
 			DisplayName: "Email",
 			Type:        "email",
-			Labels: labels{
+			Labels: channelLabels{
 				EmailAddress: project.StackdriverAlertEmail,
 			},
 		}
@@ -823,10 +1017,11 @@ func createAlerts(project *config.Project, rn runner.Runner) error {
 		if err != nil {
 			return fmt.Errorf("failed to create new monitoring channel: %v", err)
 		}
-		var c channel
-		if err := json.Unmarshal(out, &c); err != nil {
+		c := new(notificationChannel)
+		if err := json.Unmarshal(out, c); err != nil {
 			return fmt.Errorf("failed to unmarshal created monitoring channel output: %v", err)
 		}
+		existing.addNotificationChannel(c)
 		chanName = c.Name
 	}
 
@@ -862,24 +1057,6 @@ func createAlerts(project *config.Project, rn runner.Runner) error {
 		NotificationChannels []string       `json:"notificationChannels"`
 	}
 
-	// Get existing alerts.
-	cmd = exec.Command("gcloud", "--project", project.ID, "alpha", "monitoring", "policies", "list", "--format", "json")
-
-	out, err = rn.CmdOutput(cmd)
-	if err != nil {
-		return fmt.Errorf("failed to list existing monitoring alert policies: %v", err)
-	}
-
-	var alerts []alert
-	if err := json.Unmarshal(out, &alerts); err != nil {
-		return fmt.Errorf("failed to unmarshal exist monitoring channels list output: %v", err)
-	}
-
-	var existingAlerts = make(map[string]*alert)
-	for _, a := range alerts {
-		existingAlerts[a.DisplayName] = &a
-	}
-
 	// Default alerts are based on default custom logging metrics created in config.addBaseResources().
 	alertsToCreate := []*alert{
 		{
@@ -930,11 +1107,12 @@ func createAlerts(project *config.Project, rn runner.Runner) error {
 		if len(b.ExpectedUsers) == 0 {
 			continue
 		}
-		metricName := config.BucketUnexpectedAccessMetricPrefix + b.Name()
+		name := b.Name()
+		metricName := config.BucketUnexpectedAccessMetricPrefix + name
 		alertsToCreate = append(alertsToCreate, &alert{
-			DisplayName: fmt.Sprintf("Unexpected Access to %s Alert", b.Name()),
+			DisplayName: fmt.Sprintf("Unexpected Access to %s Alert", name),
 			Documentation: &documentation{
-				Content: fmt.Sprintf("This policy ensures the designated user/group is notified when bucket %s is accessed by an unexpected user.", b.Name()),
+				Content: fmt.Sprintf("This policy ensures the designated user/group is notified when bucket %s is accessed by an unexpected user.", name),
 			},
 			Conditions: []*condition{
 				{
@@ -947,8 +1125,14 @@ func createAlerts(project *config.Project, rn runner.Runner) error {
 		})
 	}
 
+	var created []string
+	var fns []func() error
 	for _, a := range alertsToCreate {
-		if existingAlerts[a.DisplayName] != nil {
+		exists, err := existing.hasAlertPolicy(a.DisplayName)
+		if err != nil {
+			return err
+		}
+		if exists {
 			continue
 		}
 		// Set common default values.
@@ -960,18 +1144,29 @@ func createAlerts(project *config.Project, rn runner.Runner) error {
 			c.ConditionThreshold.Comparison = "COMPARISON_GT"
 			c.ConditionThreshold.Duration = "0s"
 		}
-		// Create alerts.
-		log.Printf("Creating alert %q", a.DisplayName)
 		b, err := json.Marshal(a)
 		if err != nil {
 			return fmt.Errorf("failed to marshal alert policy to create: %v", err)
 		}
-		cmd := exec.Command("gcloud", "--project", project.ID, "alpha", "monitoring", "policies", "create", fmt.Sprintf("--policy=%s", string(b)))
-		if err := rn.CmdRun(cmd); err != nil {
-			return fmt.Errorf("failed to create new alert policy %q: %v", a.DisplayName, err)
-		}
+		name := a.DisplayName
+		created = append(created, name)
+		fns = append(fns, func() error {
+			log.Printf("Creating alert %q", name)
+			cmd := exec.Command("gcloud", "--project", project.ID, "alpha", "monitoring", "policies", "create", fmt.Sprintf("--policy=%s", string(b)))
+			if err := rn.CmdRun(cmd); err != nil {
+				return fmt.Errorf("failed to create new alert policy %q: %v", name, err)
+			}
+			return nil
+		})
 	}
 
+	// Alert policies are independent of each other, so create them concurrently.
+	if err := RunConcurrently(maxConcurrentCommands, false, fns); err != nil {
+		return err
+	}
+	for _, name := range created {
+		existing.addAlertPolicy(name)
+	}
 	return nil
 }
 
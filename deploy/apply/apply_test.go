@@ -22,9 +22,12 @@ import (
 	"fmt"
 	"os/exec"
 	"path/filepath"
+	"sort"
 	"strings"
+	"sync"
 	"testing"
 	"text/template"
+	"time"
 
 	"github.com/GoogleCloudPlatform/healthcare/deploy/config"
 	"github.com/GoogleCloudPlatform/healthcare/deploy/deploymentmanager"
@@ -178,14 +181,22 @@ func contains(s string, subs ...string) bool {
 }
 
 type testRunner struct {
+	// mu guards called as some steps run commands concurrently.
+	mu     sync.Mutex
 	called []string
 	// Any command called on the runner will return the following output and error unless treated differently.
 	cmdOutput string
 	cmdErr    error
 }
 
-func (r *testRunner) CmdRun(cmd *exec.Cmd) error {
+func (r *testRunner) record(cmd *exec.Cmd) {
+	r.mu.Lock()
+	defer r.mu.Unlock()
 	r.called = append(r.called, strings.Join(cmd.Args, " "))
+}
+
+func (r *testRunner) CmdRun(cmd *exec.Cmd) error {
+	r.record(cmd)
 	return r.cmdErr
 }
 
@@ -200,7 +211,7 @@ func (r *testRunner) CmdOutput(cmd *exec.Cmd) ([]byte, error) {
 			"writerIdentity": "serviceAccount:p12345-999999@gcp-sa-logging.iam.gserviceaccount.com"
 		}`
 
-	r.called = append(r.called, strings.Join(cmd.Args, " "))
+	r.record(cmd)
 	switch cmdStr := strings.Join(cmd.Args, " "); {
 	case contains(cmdStr, "logging sinks describe audit-logs-to-bigquery", "--format json"):
 		return []byte(logSinkJSON), r.cmdErr
@@ -214,7 +225,7 @@ func (r *testRunner) CmdOutput(cmd *exec.Cmd) ([]byte, error) {
 }
 
 func (r *testRunner) CmdCombinedOutput(cmd *exec.Cmd) ([]byte, error) {
-	r.called = append(r.called, strings.Join(cmd.Args, " "))
+	r.record(cmd)
 	return []byte(r.cmdOutput), r.cmdErr
 }
 
@@ -627,6 +638,90 @@ resources:
 	}
 }
 
+func TestConfigHash(t *testing.T) {
+	_, project := testconf.ConfigAndProject(t, nil)
+	h1, err := configHash(project)
+	if err != nil {
+		t.Fatalf("configHash: %v", err)
+	}
+	h2, err := configHash(project)
+	if err != nil {
+		t.Fatalf("configHash: %v", err)
+	}
+	if h1 != h2 {
+		t.Errorf("configHash of the same config = %q, %q; want equal", h1, h2)
+	}
+
+	project.EnabledAPIs = append(project.EnabledAPIs, "foo.googleapis.com")
+	h3, err := configHash(project)
+	if err != nil {
+		t.Fatalf("configHash: %v", err)
+	}
+	if h3 == h1 {
+		t.Errorf("configHash of changed config = %q; want different from %q", h3, h1)
+	}
+}
+
+func TestUpdateGCEInfo(t *testing.T) {
+	const instancesJSON = `[{"name": "foo-instance", "id": "123"}]`
+	tests := []struct {
+		name        string
+		changed     bool
+		cachedInfo  []config.GCEInstanceInfo
+		wantCollect bool
+	}{
+		{
+			name:       "unchanged",
+			cachedInfo: []config.GCEInstanceInfo{{Name: "foo-instance", ID: "123"}},
+		},
+		{
+			name:        "changed",
+			changed:     true,
+			cachedInfo:  []config.GCEInstanceInfo{{Name: "foo-instance", ID: "123"}},
+			wantCollect: true,
+		},
+		{
+			name:        "unchanged_missing_instance",
+			wantCollect: true,
+		},
+	}
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			_, project := testconf.ConfigAndProject(t, &testconf.ConfigData{`
+resources:
+  gce_instances:
+  - properties:
+      name: foo-instance
+      zone: us-east1-a
+      diskImage: projects/ubuntu-os-cloud/global/images/family/ubuntu-1804-lts
+      machineType: f1-micro`})
+			hash, err := configHash(project)
+			if err != nil {
+				t.Fatalf("configHash: %v", err)
+			}
+			project.GeneratedFields.ConfigHash = hash
+			if tc.changed {
+				project.GeneratedFields.ConfigHash = "old-hash"
+			}
+			project.GeneratedFields.GCEInstanceInfoList = tc.cachedInfo
+
+			r := &testRunner{cmdOutput: instancesJSON}
+			if err := updateGCEInfo(project, hash, r); err != nil {
+				t.Fatalf("updateGCEInfo: %v", err)
+			}
+			if gotCollect := len(r.called) > 0; gotCollect != tc.wantCollect {
+				t.Errorf("updateGCEInfo collected info = %t (commands %v); want %t", gotCollect, r.called, tc.wantCollect)
+			}
+			if got := project.GeneratedFields.ConfigHash; got != hash {
+				t.Errorf("config hash = %q; want %q", got, hash)
+			}
+			if _, err := project.GeneratedFields.InstanceID("foo-instance"); err != nil {
+				t.Errorf("InstanceID: %v", err)
+			}
+		})
+	}
+}
+
 func TestVerifyProject(t *testing.T) {
 	tests := []struct {
 		name           string
@@ -762,6 +857,47 @@ func TestVerifyProject(t *testing.T) {
 	}
 }
 
+// createProjectRunner is a testRunner for a project that does not exist yet.
+type createProjectRunner struct {
+	testRunner
+}
+
+func (r *createProjectRunner) CmdOutput(cmd *exec.Cmd) ([]byte, error) {
+	r.record(cmd)
+	switch cmdStr := strings.Join(cmd.Args, " "); {
+	case contains(cmdStr, "projects describe"):
+		return nil, errors.New("project does not exist")
+	case contains(cmdStr, "projects create"):
+		return []byte(`{"projectId": "my-project", "projectNumber": "1234"}`), nil
+	default:
+		return nil, nil
+	}
+}
+
+func TestVerifyOrCreateProject(t *testing.T) {
+	conf, project := testconf.ConfigAndProject(t, nil)
+	project.GeneratedFields.ProjectNumber = ""
+
+	r := &createProjectRunner{}
+	if err := verifyOrCreateProject(conf, project, r); err != nil {
+		t.Fatalf("verifyOrCreateProject = %v", err)
+	}
+	if got, want := project.GeneratedFields.ProjectNumber, "1234"; got != want {
+		t.Errorf("project number = %q; want %q", got, want)
+	}
+
+	// The project number is taken from the create output instead of describing the project again.
+	var describes int
+	for _, c := range r.called {
+		if strings.Contains(c, "projects describe") {
+			describes++
+		}
+	}
+	if describes != 1 {
+		t.Errorf("verifyOrCreateProject described the project %d times; want 1", describes)
+	}
+}
+
 func TestSetupBilling(t *testing.T) {
 	tests := []struct {
 		name          string
@@ -804,6 +940,133 @@ func TestSetupBilling(t *testing.T) {
 	}
 }
 
+func TestRunConcurrently(t *testing.T) {
+	errFoo, errBar := errors.New("foo"), errors.New("bar")
+	tests := []struct {
+		name       string
+		stopEarly  bool
+		errs       []error
+		wantCalled []int
+		wantErr    string
+	}{
+		{
+			name:       "success",
+			errs:       []error{nil, nil, nil},
+			wantCalled: []int{0, 1, 2},
+		},
+		{
+			name:       "single_failure",
+			errs:       []error{nil, errFoo, nil},
+			wantCalled: []int{0, 1, 2},
+			wantErr:    "foo",
+		},
+		{
+			name:       "all_failures_reported",
+			errs:       []error{errFoo, nil, errBar},
+			wantCalled: []int{0, 1, 2},
+			wantErr:    "2 calls failed: foo; bar",
+		},
+		{
+			name:       "stop_early",
+			stopEarly:  true,
+			errs:       []error{nil, errFoo, nil},
+			wantCalled: []int{0, 1},
+			wantErr:    "foo",
+		},
+	}
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			var called []int
+			var fns []func() error
+			for i, err := range tc.errs {
+				i, err := i, err
+				fns = append(fns, func() error {
+					called = append(called, i)
+					return err
+				})
+			}
+
+			// Run one at a time so the order of calls and skipped calls are deterministic.
+			var gotErr string
+			if err := RunConcurrently(1, tc.stopEarly, fns); err != nil {
+				gotErr = err.Error()
+			}
+			if gotErr != tc.wantErr {
+				t.Errorf("RunConcurrently error = %q; want %q", gotErr, tc.wantErr)
+			}
+			if diff := cmp.Diff(called, tc.wantCalled); diff != "" {
+				t.Errorf("called differs (-got +want):\n%v", diff)
+			}
+		})
+	}
+}
+
+func TestRunConcurrentlyLimitsInFlightCalls(t *testing.T) {
+	const n = 3
+	var (
+		mu       sync.Mutex
+		inFlight int
+		maxSeen  int
+		calls    int
+	)
+	var fns []func() error
+	for i := 0; i < 10; i++ {
+		fns = append(fns, func() error {
+			mu.Lock()
+			calls++
+			inFlight++
+			if inFlight > maxSeen {
+				maxSeen = inFlight
+			}
+			mu.Unlock()
+
+			time.Sleep(20 * time.Millisecond)
+
+			mu.Lock()
+			inFlight--
+			mu.Unlock()
+			return nil
+		})
+	}
+
+	if err := RunConcurrently(n, false, fns); err != nil {
+		t.Fatalf("RunConcurrently = %v", err)
+	}
+	if calls != len(fns) {
+		t.Errorf("RunConcurrently made %d calls; want %d", calls, len(fns))
+	}
+	if maxSeen != n {
+		t.Errorf("RunConcurrently ran at most %d calls at the same time; want %d", maxSeen, n)
+	}
+}
+
+func TestEnableServiceAPIs(t *testing.T) {
+	project := &config.Project{ID: "my_project"}
+	for i := 0; i < 12; i++ {
+		project.EnabledAPIs = append(project.EnabledAPIs, fmt.Sprintf("api%02d.googleapis.com", i))
+	}
+
+	r := &testRunner{}
+	if err := enableServiceAPIs(project, r); err != nil {
+		t.Fatalf("enableServiceAPIs = %v", err)
+	}
+
+	// 12 requested APIs + 2 required APIs are sent in 2 batches, in any order.
+	sort.Strings(r.called)
+	want := []string{
+		"gcloud --project my_project services enable api00.googleapis.com api01.googleapis.com api02.googleapis.com api03.googleapis.com api04.googleapis.com api05.googleapis.com api06.googleapis.com api07.googleapis.com api08.googleapis.com api09.googleapis.com",
+		"gcloud --project my_project services enable api10.googleapis.com api11.googleapis.com cloudresourcemanager.googleapis.com deploymentmanager.googleapis.com",
+	}
+	if diff := cmp.Diff(r.called, want); diff != "" {
+		t.Fatalf("enableServiceAPIs commands differ (-got +want):\n%v", diff)
+	}
+
+	r = &testRunner{cmdErr: errors.New("quota exceeded")}
+	if err := enableServiceAPIs(project, r); err == nil {
+		t.Fatal("enableServiceAPIs = nil; want error")
+	}
+}
+
 func TestCreateDeletionLien(t *testing.T) {
 	tests := []struct {
 		name        string
@@ -832,7 +1095,7 @@ func TestCreateDeletionLien(t *testing.T) {
 				ID:                 "my_project",
 				CreateDeletionLien: true,
 			},
-			cmdOutput:   "resourcemanager.projects.delete",
+			cmdOutput:   `[{"name": "liens/p1234-5678", "restrictions": ["resourcemanager.projects.delete"]}]`,
 			wantCmdCnts: 1,
 		},
 	}
@@ -840,7 +1103,7 @@ func TestCreateDeletionLien(t *testing.T) {
 	for _, tc := range tests {
 		t.Run(tc.name, func(t *testing.T) {
 			r := &testRunner{cmdOutput: tc.cmdOutput}
-			if err := createDeletionLien(tc.project, r); err != nil {
+			if err := createDeletionLien(tc.project, newExistingResources(tc.project.ID, r), r); err != nil {
 				t.Fatalf("createDeletionLien = %v", err)
 			}
 			if len(r.called) != tc.wantCmdCnts {
@@ -850,6 +1113,74 @@ func TestCreateDeletionLien(t *testing.T) {
 	}
 }
 
+func TestCreateCustomComputeImages(t *testing.T) {
+	_, project := testconf.ConfigAndProject(t, &testconf.ConfigData{`
+resources:
+  gce_instances:
+  - properties:
+      name: foo-instance
+      zone: us-east1-a
+    custom_boot_image:
+      image_name: foo-image
+      gcs_path: foo-bucket/foo-image.tar.gz
+  - properties:
+      name: bar-instance
+      zone: us-east1-a
+    custom_boot_image:
+      image_name: bar-image
+      gcs_path: bar-bucket/bar-image.tar.gz
+  - properties:
+      name: baz-instance
+      zone: us-east1-a
+    custom_boot_image:
+      image_name: bar-image
+      gcs_path: bar-bucket/bar-image.tar.gz`})
+
+	r := &testRunner{cmdOutput: `[{"name": "foo-image"}]`}
+	if err := createCustomComputeImages(project, newExistingResources(project.ID, r), r); err != nil {
+		t.Fatalf("createCustomComputeImages = %v", err)
+	}
+
+	// Existing images are listed once and only the missing image is created, once.
+	want := []string{
+		"gcloud --project my-project compute images list --no-standard-images --format json",
+		"gcloud --project my-project compute images create bar-image --source-uri gs://bar-bucket/bar-image.tar.gz",
+	}
+	if diff := cmp.Diff(r.called, want); diff != "" {
+		t.Fatalf("createCustomComputeImages commands differ (-got +want):\n%v", diff)
+	}
+}
+
+func TestCreateAlertsUsesExistingEmailChannel(t *testing.T) {
+	_, project := testconf.ConfigAndProject(t, nil)
+	project.StackdriverAlertEmail = "alerts@my-domain.com"
+
+	// Channels without an email address (e.g. pubsub channels) must be skipped.
+	r := &testRunner{cmdOutput: `[
+  {"name": "projects/my-project/notificationChannels/1", "type": "pubsub", "labels": {"topic": "projects/my-project/topics/foo"}},
+  {"name": "projects/my-project/notificationChannels/2", "type": "email", "labels": {"email_address": "alerts@my-domain.com"}}
+]`}
+	if err := createAlerts(project, newExistingResources(project.ID, r), r); err != nil {
+		t.Fatalf("createAlerts = %v", err)
+	}
+
+	var created int
+	for _, c := range r.called {
+		if strings.Contains(c, "channels create") {
+			t.Errorf("createAlerts created a channel: %q", c)
+		}
+		if strings.Contains(c, "policies create") {
+			created++
+			if !strings.Contains(c, "projects/my-project/notificationChannels/2") {
+				t.Errorf("alert policy does not use existing email channel: %q", c)
+			}
+		}
+	}
+	if created == 0 {
+		t.Error("createAlerts did not create any alert policies")
+	}
+}
+
 func TestStackdriverAccountExist(t *testing.T) {
 	projectID := "my_project"
 	tests := []struct {
@@ -887,6 +1218,67 @@ func TestStackdriverAccountExist(t *testing.T) {
 	}
 }
 
+// stackdriverRunner reports the Stackdriver account as missing for the first checks.
+type stackdriverRunner struct {
+	testRunner
+	missingChecks int
+}
+
+func (r *stackdriverRunner) CmdCombinedOutput(cmd *exec.Cmd) ([]byte, error) {
+	r.record(cmd)
+	if r.missingChecks > 0 {
+		r.missingChecks--
+		return []byte("INVALID_ARGUMENT: 'projects/my-project' is not a Stackdriver workspace."), errors.New("")
+	}
+	return []byte("Listed 0 items."), nil
+}
+
+func TestWaitForStackdriverAccount(t *testing.T) {
+	var slept []time.Duration
+	sleep = func(d time.Duration) { slept = append(slept, d) }
+	defer func() { sleep = time.Sleep }()
+
+	tests := []struct {
+		name          string
+		missingChecks int
+		wantExist     bool
+		wantSlept     int
+	}{
+		{name: "exists", wantExist: true},
+		{name: "created_while_polling", missingChecks: 3, wantExist: true, wantSlept: 3},
+		{name: "not_created", missingChecks: 100, wantSlept: len(stackdriverAccountPollDelays)},
+	}
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			slept = nil
+			r := &stackdriverRunner{missingChecks: tc.missingChecks}
+			exist, err := waitForStackdriverAccount("my-project", r)
+			if exist != tc.wantExist || err != nil {
+				t.Fatalf("waitForStackdriverAccount = %t, %v; want %t, nil", exist, err, tc.wantExist)
+			}
+			if len(slept) != tc.wantSlept {
+				t.Errorf("waitForStackdriverAccount slept %v; want %d delays", slept, tc.wantSlept)
+			}
+			if got, want := len(r.called), tc.wantSlept+1; got != want {
+				t.Errorf("waitForStackdriverAccount checked %d times; want %d", got, want)
+			}
+		})
+	}
+}
+
+func TestAuthenticatedUser(t *testing.T) {
+	r := &testRunner{}
+	for i := 0; i < 2; i++ {
+		got, err := authenticatedUser("my-project", r)
+		if want := "foo-user@my-domain.com"; got != want || err != nil {
+			t.Fatalf("authenticatedUser = %q, %v; want %q, nil", got, err, want)
+		}
+	}
+	if len(r.called) != 1 {
+		t.Errorf("authenticatedUser ran %d commands; want 1", len(r.called))
+	}
+}
+
 func TestGetLogSinkServiceAccount(t *testing.T) {
 	_, project := testconf.ConfigAndProject(t, nil)
 	got, err := getLogSinkServiceAccount(project, "audit-logs-to-bigquery", &testRunner{})
@@ -0,0 +1,170 @@
+/*
+ * Copyright 2019 Google LLC.
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ * http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+package apply
+
+import (
+	"bytes"
+	"encoding/json"
+	"fmt"
+	"os/exec"
+
+	"github.com/GoogleCloudPlatform/healthcare/deploy/runner"
+)
+
+// channelLabels defines the labels of a monitoring notification channel.
+type channelLabels struct {
+	EmailAddress string `json:"email_address"`
+}
+
+// notificationChannel defines a monitoring notification channel.
+// https://cloud.google.com/monitoring/api/ref_v3/rest/v3/projects.notificationChannels
+type notificationChannel struct {
+	Name        string        `json:"name"`
+	DisplayName string        `json:"displayName"`
+	Type        string        `json:"type"`
+	Labels      channelLabels `json:"labels"`
+}
+
+// existingResources lists the existing resources of a project that the deployment only creates if missing.
+// Each kind of resource is listed at most once, on first use, so repeated lookups do not need to run gcloud again.
+// An existingResources should only be used for a single project during a single apply.
+type existingResources struct {
+	projectID string
+	rn        runner.Runner
+
+	images map[string]bool
+	// channels maps email addresses to the names of their email notification channels.
+	channels      map[string]string
+	alertPolicies map[string]bool
+	liens         map[string]bool
+}
+
+func newExistingResources(projectID string, rn runner.Runner) *existingResources {
+	return &existingResources{projectID: projectID, rn: rn}
+}
+
+// list runs the given gcloud list command in the project and unmarshals its JSON output into v.
+func (e *existingResources) list(v interface{}, args ...string) error {
+	args = append([]string{"--project", e.projectID}, args...)
+	args = append(args, "--format", "json")
+	cmd := exec.Command("gcloud", args...)
+	out, err := e.rn.CmdOutput(cmd)
+	if err != nil {
+		return err
+	}
+	// Dry runs do not return any output, treat that as an empty list.
+	if len(bytes.TrimSpace(out)) == 0 {
+		return nil
+	}
+	return json.Unmarshal(out, v)
+}
+
+// hasImage returns whether a custom compute image with the given name exists.
+func (e *existingResources) hasImage(name string) (bool, error) {
+	if e.images == nil {
+		var images []struct {
+			Name string `json:"name"`
+		}
+		if err := e.list(&images, "compute", "images", "list", "--no-standard-images"); err != nil {
+			return false, fmt.Errorf("failed to list existing custom images: %v", err)
+		}
+		e.images = make(map[string]bool)
+		for _, i := range images {
+			e.images[i.Name] = true
+		}
+	}
+	return e.images[name], nil
+}
+
+// addImage records a newly created custom compute image.
+func (e *existingResources) addImage(name string) {
+	if e.images != nil {
+		e.images[name] = true
+	}
+}
+
+// emailChannel returns the name of the existing monitoring notification channel for the given email address.
+// An empty name is returned if there is no such channel.
+func (e *existingResources) emailChannel(email string) (string, error) {
+	if e.channels == nil {
+		var channels []*notificationChannel
+		if err := e.list(&channels, "alpha", "monitoring", "channels", "list"); err != nil {
+			return "", fmt.Errorf("failed to list existing monitoring channels: %v", err)
+		}
+		e.channels = make(map[string]string)
+		for _, c := range channels {
+			// Only email channels have an email address. Assume only one channel exists per email.
+			if c == nil || c.Labels.EmailAddress == "" {
+				continue
+			}
+			if _, ok := e.channels[c.Labels.EmailAddress]; !ok {
+				e.channels[c.Labels.EmailAddress] = c.Name
+			}
+		}
+	}
+	return e.channels[email], nil
+}
+
+// addNotificationChannel records a newly created monitoring notification channel.
+func (e *existingResources) addNotificationChannel(c *notificationChannel) {
+	if e.channels != nil && c.Labels.EmailAddress != "" {
+		e.channels[c.Labels.EmailAddress] = c.Name
+	}
+}
+
+// hasAlertPolicy returns whether a monitoring alert policy with the given display name exists.
+func (e *existingResources) hasAlertPolicy(displayName string) (bool, error) {
+	if e.alertPolicies == nil {
+		var policies []struct {
+			DisplayName string `json:"displayName"`
+		}
+		if err := e.list(&policies, "alpha", "monitoring", "policies", "list"); err != nil {
+			return false, fmt.Errorf("failed to list existing monitoring alert policies: %v", err)
+		}
+		e.alertPolicies = make(map[string]bool)
+		for _, p := range policies {
+			e.alertPolicies[p.DisplayName] = true
+		}
+	}
+	return e.alertPolicies[displayName], nil
+}
+
+// addAlertPolicy records a newly created monitoring alert policy.
+func (e *existingResources) addAlertPolicy(displayName string) {
+	if e.alertPolicies != nil {
+		e.alertPolicies[displayName] = true
+	}
+}
+
+// hasLien returns whether a lien with the given restriction exists.
+func (e *existingResources) hasLien(restriction string) (bool, error) {
+	if e.liens == nil {
+		var liens []struct {
+			Restrictions []string `json:"restrictions"`
+		}
+		if err := e.list(&liens, "alpha", "resource-manager", "liens", "list"); err != nil {
+			return false, fmt.Errorf("failed to list existing liens: %v", err)
+		}
+		e.liens = make(map[string]bool)
+		for _, l := range liens {
+			for _, r := range l.Restrictions {
+				e.liens[r] = true
+			}
+		}
+	}
+	return e.liens[restriction], nil
+}
@@ -21,6 +21,7 @@ import (
 	"log"
 	"os"
 	"os/exec"
+	"sync"
 
 	"github.com/GoogleCloudPlatform/healthcare/deploy/config"
 	"github.com/GoogleCloudPlatform/healthcare/deploy/runner"
@@ -87,6 +88,11 @@ func importBinauthz(projectID string, binauthz *config.BinAuthz, rn runner.Runne
 	return configBinauthzPolicy(tmp.Name(), projectID, rn)
 }
 
+// kubeconfigMu serializes fetching cluster credentials and using them with kubectl.
+// "gcloud container clusters get-credentials" sets the current context of the shared kubeconfig file,
+// which kubectl then uses, and projects may be applied concurrently.
+var kubeconfigMu sync.Mutex
+
 // installClusterWorkloadFromFile creates and updates (when it exists) not only workloads
 // but also all resources supported by "kubectl apply -f".
 func installClusterWorkloadFromFile(clusterName, containerYamlPath string, project *config.Project, rn runner.Runner) error {
@@ -98,6 +104,8 @@ func installClusterWorkloadFromFile(clusterName, containerYamlPath string, proje
 	if err != nil {
 		return err
 	}
+	kubeconfigMu.Lock()
+	defer kubeconfigMu.Unlock()
 	if err := getGCloudCredentials(clusterName, locationType, locationValue, project.ID, rn); err != nil {
 		return err
 	}
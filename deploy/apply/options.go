@@ -27,4 +27,10 @@ type Options struct {
 	TerraformConfigsPath string
 	// Extra flags to pass to terraform apply command.
 	TerraformApplyFlags []string
+	// DEPLOYMENT MANAGER ONLY. Toggle whether granting the Forseti service account access to the project is skipped.
+	// Set when the caller grants access itself, e.g. because the Forseti project is being applied at the same time.
+	SkipForsetiPermissions bool
+	// DEPLOYMENT MANAGER ONLY. Toggle whether Default skips the SetupProject steps.
+	// Set when the caller already ran SetupProject, e.g. to prompt the user before applying projects concurrently.
+	SkipSetup bool
 }
@@ -48,9 +48,18 @@ var (
 	importExisting      = flag.Bool("terraform_import_existing", false, "TERRAFORM ONLY. Whether applicable Terraform resources will try to be imported (used for migrating an existing installation).")
 	terraformConfigsDir = flag.String("terraform_configs_dir", "", "TERRAFORM ONLY. Directory path to store generated Terraform configs. The configs are discarded if not specified.")
 	terraformApplyFlags = flag.String("terraform_apply_flags", "", "TERRAFORM ONLY. Extra option flags to pass to apply command.")
+	maxParallelProjects = flag.Int("max_parallel_projects", 4, "DEPLOYMENT MANAGER ONLY. Maximum number of data hosting projects to apply at the same time.")
 	projects            arrayFlags
 )
 
+// The following vars are stubbed in tests.
+var (
+	applyDefault            = apply.Default
+	applyForseti            = apply.Forseti
+	grantForsetiPermissions = apply.GrantForsetiPermissions
+	setupProject            = apply.SetupProject
+)
+
 type arrayFlags []string
 
 func (i *arrayFlags) String() string {
@@ -168,8 +177,13 @@ func applyConfigs() (err error) {
 		return apply.Terraform(conf, projects, opts, rn)
 	}
 
-	// DM ONLY CODE.
-	// TODO: remove this once DM support is shut down.
+	return deploymentManagerApply(conf, opts, rn)
+}
+
+// deploymentManagerApply applies the projects selected by --projects using deployment manager.
+// DM ONLY CODE.
+// TODO: remove this once DM support is shut down.
+func deploymentManagerApply(conf *config.Config, opts *apply.Options, rn runner.Runner) error {
 	wantProjects := make(map[string]bool)
 	for _, p := range projects {
 		wantProjects[p] = true
@@ -188,49 +202,139 @@ func applyConfigs() (err error) {
 	// Always deploy the remote audit logs project first (if present).
 	if enableRemoteAudit {
 		log.Printf("Applying config for remote audit log project %q", conf.AuditLogsProject.ID)
-		if err := apply.Default(conf, conf.AuditLogsProject, opts, rn); err != nil {
+		if err := applyDefault(conf, conf.AuditLogsProject, opts, rn); err != nil {
 			return fmt.Errorf("failed to apply config for remote audit log project %q: %v", conf.AuditLogsProject.ID, err)
 		}
 	}
 
-	// Deploy the Forseti project.
-	if conf.Forseti != nil && wantProject(conf.Forseti.Project.ID) {
+	deployForseti := conf.Forseti != nil && wantProject(conf.Forseti.Project.ID)
+	if conf.Forseti != nil && !deployForseti && conf.AllGeneratedFields.Forseti.ServiceAccount == "" {
+		return fmt.Errorf("forseti project config is specified but has never been deployed")
+	}
+
+	forsetiApplied := false
+	forsetiOpts := opts
+	forsetiFn := func() error {
 		log.Printf("Applying config for Forseti project %q", conf.Forseti.Project.ID)
 		// Forseti for Forseti project itself is enabled at the end of apply.Forseti().
-		if err := apply.Forseti(conf, opts, *terraformConfigsDir, rn); err != nil {
+		if err := applyForseti(conf, forsetiOpts, opts.TerraformConfigsPath, rn); err != nil {
 			return fmt.Errorf("failed to apply config for Forseti project %q: %v", conf.Forseti.Project.ID, err)
 		}
+		forsetiApplied = true
+		return nil
 	}
 
-	if conf.Forseti != nil && conf.AllGeneratedFields.Forseti.ServiceAccount == "" {
-		return fmt.Errorf("forseti project config is specified but has never been deployed")
+	// Only the remote audit logs project is a dependency of the other projects,
+	// so the Forseti project and data hosting projects are applied concurrently.
+	// Each project only writes to its own generated fields, which are all created when the config is loaded.
+	// Unless auto approved, terraform asks the user to confirm the Forseti plan on stdin,
+	// so the Forseti project is then applied on its own first.
+	var fns []func() error
+	// Projects to set up one at a time before they are applied concurrently.
+	var setups []*config.Project
+	if deployForseti {
+		if autoApproved(opts.TerraformApplyFlags) {
+			o := *opts
+			o.SkipSetup = true
+			forsetiOpts = &o
+			setups = append(setups, conf.Forseti.Project)
+			fns = append(fns, forsetiFn)
+		} else if err := forsetiFn(); err != nil {
+			return err
+		}
 	}
 
-	// Use conf.AllGeneratedFields.Forseti.ServiceAccount to check if the Forseti project has been deployed or not.
-	if enableRemoteAudit && conf.AllGeneratedFields.Forseti.ServiceAccount != "" {
-		// Grant Forseti permissions in remote audit log project after Forseti project is deployed.
-		workDir, err := terraform.WorkDir(*terraformConfigsDir, conf.AuditLogsProject.ID)
-		if err != nil {
-			return err
+	// Granting Forseti access also runs terraform, and the Forseti service account may only be known once the
+	// Forseti project is applied, so data hosting projects are granted access one at a time after all projects are done.
+	dataOpts := *opts
+	dataOpts.SkipForsetiPermissions = true
+	dataOpts.SkipSetup = true
+
+	var dataProjects []*config.Project
+	for _, p := range conf.Projects {
+		if wantProject(p.ID) {
+			dataProjects = append(dataProjects, p)
 		}
-		if err := apply.GrantForsetiPermissions(conf.AuditLogsProject.ID, conf.AllGeneratedFields.Forseti.ServiceAccount, "", opts, workDir, rn); err != nil {
-			return fmt.Errorf("failed to grant Forseti permissions to remote audit logs project: %v", err)
+	}
+	setups = append(setups, dataProjects...)
+
+	// Setting up a project may prompt the user to create its Stackdriver account,
+	// so do it before any project is applied concurrently to keep other projects' output and commands away from the prompt.
+	for _, p := range setups {
+		log.Printf("Setting up project %q", p.ID)
+		if err := setupProject(conf, p, rn); err != nil {
+			return fmt.Errorf("failed to set up project %q: %v", p.ID, err)
 		}
 	}
 
-	for _, p := range conf.Projects {
-		if !wantProject(p.ID) {
-			continue
+	applied := make([]bool, len(dataProjects))
+	for i, p := range dataProjects {
+		i, p := i, p
+		fns = append(fns, func() error {
+			log.Printf("Applying config for project %q", p.ID)
+			if err := applyDefault(conf, p, &dataOpts, rn); err != nil {
+				return fmt.Errorf("failed to apply config for project %q: %v", p.ID, err)
+			}
+			applied[i] = true
+			return nil
+		})
+	}
+	applyErr := apply.RunConcurrently(*maxParallelProjects, true, fns)
+
+	// Use conf.AllGeneratedFields.Forseti.ServiceAccount to check if the Forseti project has been deployed or not.
+	fsa := conf.AllGeneratedFields.Forseti.ServiceAccount
+	if conf.Forseti != nil && fsa == "" {
+		if applyErr != nil {
+			return applyErr
+		}
+		return fmt.Errorf("forseti project config is specified but has never been deployed")
+	}
+
+	// Projects that were applied are still granted access if other projects failed,
+	// unless the Forseti project was being applied and failed.
+	if fsa != "" && (!deployForseti || forsetiApplied) {
+		var grants []*config.Project
+		if enableRemoteAudit {
+			// Grant Forseti permissions in remote audit log project after Forseti project is deployed.
+			grants = append(grants, conf.AuditLogsProject)
+		}
+		for i, p := range dataProjects {
+			if applied[i] {
+				grants = append(grants, p)
+			}
 		}
-		log.Printf("Applying config for project %q", p.ID)
-		if err := apply.Default(conf, p, opts, rn); err != nil {
-			return fmt.Errorf("failed to apply config for project %q: %v", p.ID, err)
+		for _, p := range grants {
+			workDir, err := terraform.WorkDir(opts.TerraformConfigsPath, p.ID)
+			if err != nil {
+				return err
+			}
+			if err := grantForsetiPermissions(p.ID, fsa, "", opts, workDir, rn); err != nil {
+				err = fmt.Errorf("failed to grant Forseti permissions to project %q: %v", p.ID, err)
+				if applyErr != nil {
+					err = fmt.Errorf("%v; %v", applyErr, err)
+				}
+				return err
+			}
 		}
 	}
+	if applyErr != nil {
+		return applyErr
+	}
 
-	if conf.AllGeneratedFields.Forseti.ServiceAccount != "" {
+	if fsa != "" {
 		log.Println("Note: Forseti rule generation is no longer run as part of this script. Please use standalone script cmd/rule_generator/rule_generator.go to generate Forseti rules.")
 	}
 
 	return nil
 }
+
+// autoApproved returns whether the terraform apply flags skip the interactive approval of the plan.
+func autoApproved(flags []string) bool {
+	for _, f := range flags {
+		switch strings.TrimLeft(f, "-") {
+		case "auto-approve", "auto-approve=true":
+			return true
+		}
+	}
+	return false
+}
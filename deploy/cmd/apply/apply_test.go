@@ -18,12 +18,20 @@ package main
 
 import (
 	"bytes"
+	"errors"
 	"io/ioutil"
 	"log"
 	"os"
 	"regexp"
+	"strings"
+	"sync"
 	"testing"
+	"time"
 
+	"github.com/GoogleCloudPlatform/healthcare/deploy/apply"
+	"github.com/GoogleCloudPlatform/healthcare/deploy/config"
+	"github.com/GoogleCloudPlatform/healthcare/deploy/runner"
+	"github.com/GoogleCloudPlatform/healthcare/deploy/testconf"
 	"github.com/google/go-cmp/cmp"
 )
 
@@ -71,3 +79,194 @@ func TestApplyConfigs(t *testing.T) {
 		t.Fatalf("logged commands differ (-got +want):\n%v\nIf you are sure the command changes are desired, copy/paste the following content (without indent) to %q:\n%s", diff, cmdFilePath, string(got))
 	}
 }
+
+func TestDeploymentManagerApplyGrantsForsetiPermissions(t *testing.T) {
+	const newForsetiSA = "forseti-server@my-forseti-project.iam.gserviceaccount.com"
+	tests := []struct {
+		name          string
+		applyFlags    []string
+		failProject   string
+		wantGrants    []string
+		wantErr       bool
+		wantFirstCall string
+	}{
+		{
+			name:       "auto_approve",
+			applyFlags: []string{"-auto-approve"},
+			wantGrants: []string{"my-project", "other-project"},
+		},
+		{
+			// Terraform asks for approval on stdin, so Forseti is applied before any other project.
+			name:          "interactive",
+			wantGrants:    []string{"my-project", "other-project"},
+			wantFirstCall: "forseti my-forseti-project",
+		},
+		{
+			name:        "failed_project",
+			applyFlags:  []string{"-auto-approve"},
+			failProject: "other-project",
+			wantGrants:  []string{"my-project"},
+			wantErr:     true,
+		},
+	}
+
+	defer stubDeploymentManagerApply()()
+
+	for _, tc := range tests {
+		t.Run(tc.name, func(t *testing.T) {
+			conf, _ := testconf.ConfigAndProject(t, nil)
+			conf.Projects = append(conf.Projects, &config.Project{ID: "other-project"})
+			// Deploy Forseti for the first time.
+			conf.AllGeneratedFields.Forseti.ServiceAccount = ""
+
+			var (
+				mu     sync.Mutex
+				calls  []string
+				grants []string
+			)
+			record := func(call string) {
+				mu.Lock()
+				defer mu.Unlock()
+				calls = append(calls, call)
+			}
+			applyForseti = func(conf *config.Config, _ *apply.Options, _ string, _ runner.Runner) error {
+				record("forseti " + conf.Forseti.Project.ID)
+				conf.AllGeneratedFields.Forseti.ServiceAccount = newForsetiSA
+				return nil
+			}
+			setupProject = func(_ *config.Config, p *config.Project, _ runner.Runner) error {
+				record("setup " + p.ID)
+				return nil
+			}
+			applyDefault = func(_ *config.Config, p *config.Project, opts *apply.Options, _ runner.Runner) error {
+				record("default " + p.ID)
+				if !opts.SkipForsetiPermissions {
+					t.Errorf("project %q applied without skipping Forseti permissions", p.ID)
+				}
+				if !opts.SkipSetup {
+					t.Errorf("project %q applied without skipping setup", p.ID)
+				}
+				if p.ID == tc.failProject {
+					return errors.New("failed")
+				}
+				return nil
+			}
+			grantForsetiPermissions = func(projectID, serviceAccount, _ string, _ *apply.Options, _ string, _ runner.Runner) error {
+				record("grant " + projectID)
+				if serviceAccount != newForsetiSA {
+					t.Errorf("granted %q to project %q; want %q", serviceAccount, projectID, newForsetiSA)
+				}
+				grants = append(grants, projectID)
+				return nil
+			}
+
+			dir, err := ioutil.TempDir("", "")
+			if err != nil {
+				t.Fatalf("ioutil.TempDir = %v", err)
+			}
+			defer os.RemoveAll(dir)
+			opts := &apply.Options{TerraformApplyFlags: tc.applyFlags, TerraformConfigsPath: dir}
+
+			if err := deploymentManagerApply(conf, opts, &runner.Fake{}); (err != nil) != tc.wantErr {
+				t.Fatalf("deploymentManagerApply = %v; want error %t", err, tc.wantErr)
+			}
+			if diff := cmp.Diff(grants, tc.wantGrants); diff != "" {
+				t.Errorf("granted projects differ (-got +want):\n%v", diff)
+			}
+			if tc.wantFirstCall != "" && calls[0] != tc.wantFirstCall {
+				t.Errorf("first call = %q; want %q", calls[0], tc.wantFirstCall)
+			}
+			// Data hosting projects are only granted access once the Forseti project has been applied.
+			forsetiIdx := -1
+			for i, c := range calls {
+				if strings.HasPrefix(c, "forseti ") {
+					forsetiIdx = i
+				}
+				if strings.HasPrefix(c, "grant ") && (forsetiIdx == -1 || forsetiIdx > i) {
+					t.Errorf("%q called before the Forseti project was applied: %v", c, calls)
+				}
+			}
+		})
+	}
+}
+
+// stubDeploymentManagerApply saves the stubbable deployment manager apply steps and the --projects flag,
+// and returns a func to restore them.
+func stubDeploymentManagerApply() func() {
+	origDefault, origForseti, origGrant, origSetup, origProjects := applyDefault, applyForseti, grantForsetiPermissions, setupProject, projects
+	projects = nil
+	return func() {
+		applyDefault, applyForseti, grantForsetiPermissions, setupProject, projects = origDefault, origForseti, origGrant, origSetup, origProjects
+	}
+}
+
+func TestDeploymentManagerApplyPromptsAlone(t *testing.T) {
+	defer stubDeploymentManagerApply()()
+
+	conf, _ := testconf.ConfigAndProject(t, nil)
+	conf.Projects = append(conf.Projects, &config.Project{ID: "other-project"}, &config.Project{ID: "third-project"})
+
+	var (
+		mu         sync.Mutex
+		promptOpen bool
+		calls      []string
+	)
+	record := func(call string) {
+		mu.Lock()
+		defer mu.Unlock()
+		if promptOpen {
+			t.Errorf("%q called while the Stackdriver prompt is open", call)
+		}
+		calls = append(calls, call)
+	}
+
+	setupProject = func(_ *config.Config, p *config.Project, _ runner.Runner) error {
+		record("setup " + p.ID)
+		// Project my-project has no Stackdriver account yet, so the user is prompted to create one.
+		if p.ID == "my-project" {
+			mu.Lock()
+			promptOpen = true
+			mu.Unlock()
+			time.Sleep(20 * time.Millisecond)
+			mu.Lock()
+			promptOpen = false
+			mu.Unlock()
+		}
+		return nil
+	}
+	applyForseti = func(conf *config.Config, opts *apply.Options, _ string, _ runner.Runner) error {
+		record("forseti " + conf.Forseti.Project.ID)
+		if !opts.SkipSetup {
+			t.Errorf("Forseti project applied concurrently without skipping setup")
+		}
+		return nil
+	}
+	applyDefault = func(_ *config.Config, p *config.Project, _ *apply.Options, _ runner.Runner) error {
+		record("default " + p.ID)
+		return nil
+	}
+	grantForsetiPermissions = func(projectID, _, _ string, _ *apply.Options, _ string, _ runner.Runner) error {
+		record("grant " + projectID)
+		return nil
+	}
+
+	dir, err := ioutil.TempDir("", "")
+	if err != nil {
+		t.Fatalf("ioutil.TempDir = %v", err)
+	}
+	defer os.RemoveAll(dir)
+	opts := &apply.Options{TerraformApplyFlags: []string{"-auto-approve"}, TerraformConfigsPath: dir}
+
+	if err := deploymentManagerApply(conf, opts, &runner.Fake{}); err != nil {
+		t.Fatalf("deploymentManagerApply = %v", err)
+	}
+
+	// All projects are set up one at a time before any project is applied.
+	wantSetups := []string{"setup my-forseti-project", "setup my-project", "setup other-project", "setup third-project"}
+	if len(calls) < len(wantSetups) {
+		t.Fatalf("calls = %v; want at least %d setup calls", calls, len(wantSetups))
+	}
+	if diff := cmp.Diff(calls[:len(wantSetups)], wantSetups); diff != "" {
+		t.Errorf("setup calls differ (-got +want):\n%v", diff)
+	}
+}
@@ -197,16 +197,25 @@ func (c *Config) validate() error {
 	if len(c.Overall.AllowedAPIs) == 0 {
 		return nil
 	}
-	allowedAPIs := make(map[string]bool)
+	allowedAPIs := make(map[string]bool, len(c.Overall.AllowedAPIs))
 	for _, a := range c.Overall.AllowedAPIs {
 		allowedAPIs[a] = true
 	}
+	// Report all disallowed APIs of all projects at once so they can be fixed in a single pass.
+	var errs []string
 	for _, p := range c.AllProjects() {
+		var disallowed []string
 		for _, a := range p.EnabledAPIs {
 			if !allowedAPIs[a] {
-				return fmt.Errorf("project %q wants to enable API %q, which is not in the allowed APIs list", p.ID, a)
+				disallowed = append(disallowed, a)
 			}
 		}
+		if len(disallowed) > 0 {
+			errs = append(errs, fmt.Sprintf("project %q wants to enable APIs %q, which are not in the allowed APIs list", p.ID, disallowed))
+		}
+	}
+	if len(errs) > 0 {
+		return errors.New(strings.Join(errs, "\n"))
 	}
 	return nil
 }
@@ -0,0 +1,38 @@
+// Copyright 2019 Google LLC
+//
+// Licensed under the Apache License, Version 2.0 (the "License");
+// you may not use this file except in compliance with the License.
+// You may obtain a copy of the License at
+//
+//      http://www.apache.org/licenses/LICENSE-2.0
+//
+// Unless required by applicable law or agreed to in writing, software
+// distributed under the License is distributed on an "AS IS" BASIS,
+// WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+// See the License for the specific language governing permissions and
+// limitations under the License.
+
+package config_test
+
+import (
+	"testing"
+
+	"github.com/GoogleCloudPlatform/healthcare/deploy/testconf"
+)
+
+func TestInitDisallowedAPIs(t *testing.T) {
+	conf := testconf.ConfigBeforeInit(t, nil)
+	conf.Forseti.Project.EnabledAPIs = []string{"foo-api.googleapis.com", "baz-api.googleapis.com"}
+	conf.Projects[0].EnabledAPIs = []string{"qux-api.googleapis.com", "bar-api.googleapis.com", "quux-api.googleapis.com"}
+
+	err := conf.Init(nil)
+	if err == nil {
+		t.Fatal("conf.Init = nil; want error")
+	}
+	want := `failed to validate config: ` +
+		`project "my-forseti-project" wants to enable APIs ["baz-api.googleapis.com"], which are not in the allowed APIs list` + "\n" +
+		`project "my-project" wants to enable APIs ["qux-api.googleapis.com" "quux-api.googleapis.com"], which are not in the allowed APIs list`
+	if got := err.Error(); got != want {
+		t.Errorf("conf.Init error =\n%v\nwant:\n%v", got, want)
+	}
+}
@@ -31,6 +31,8 @@ type GeneratedFields struct {
 	ProjectNumber         string            `json:"project_number,omitempty"`
 	LogSinkServiceAccount string            `json:"log_sink_service_account,omitempty"`
 	GCEInstanceInfoList   []GCEInstanceInfo `json:"gce_instance_info,omitempty"`
+	// ConfigHash is the hash of the project config that GCEInstanceInfoList was last collected for.
+	ConfigHash string `json:"config_hash,omitempty"`
 }
 
 // GCEInstanceInfo defines the generated fields for instances in a project.
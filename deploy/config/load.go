@@ -18,12 +18,15 @@ package config
 
 import (
 	"bytes"
+	"encoding/json"
 	"errors"
 	"fmt"
 	"io/ioutil"
 	"os"
 	"path/filepath"
 	"strings"
+	"sync"
+	"syscall"
 	"text/template"
 
 	"github.com/ghodss/yaml"
@@ -77,12 +80,14 @@ func Load(path string) (*Config, error) {
 		return nil, fmt.Errorf("failed to load config to map: %v", err)
 	}
 
-	b, err := yaml.Marshal(m)
+	// Marshal the merged map directly to JSON since schema validation works on JSON.
+	// JSON is a subset of YAML so the same bytes can still be unmarshalled with YAML type conversions.
+	b, err := json.Marshal(m)
 	if err != nil {
 		return nil, fmt.Errorf("failed to marshal config map: %v", err)
 	}
 
-	if err := ValidateConf(b); err != nil {
+	if err := validateJSON(b, projectConfigSchema); err != nil {
 		return nil, err
 	}
 
@@ -126,22 +131,53 @@ func validateGenFields(genFieldsYAML []byte) error {
 	return validate(genFieldsYAML, generatedFieldsSchema)
 }
 
-// validate validates the input yaml against the given schema template.
-func validate(inputYAML []byte, schemaPath string) error {
+// schemas caches compiled schemas by path as they are large and do not change during a run.
+var schemas = struct {
+	sync.Mutex
+	m map[string]*gojsonschema.Schema
+}{m: make(map[string]*gojsonschema.Schema)}
+
+// loadSchema reads and compiles the schema template at the given path, or returns it from the cache.
+func loadSchema(schemaPath string) (*gojsonschema.Schema, error) {
+	schemas.Lock()
+	defer schemas.Unlock()
+	if s, ok := schemas.m[schemaPath]; ok {
+		return s, nil
+	}
+
 	schemaYAML, err := ioutil.ReadFile(schemaPath)
 	if err != nil {
-		return fmt.Errorf("failed to read schema file at path %q: %v", schemaPath, err)
+		return nil, fmt.Errorf("failed to read schema file at path %q: %v", schemaPath, err)
 	}
 	schemaJSON, err := yaml.YAMLToJSON(schemaYAML)
 	if err != nil {
-		return fmt.Errorf("failed to convert schema file at path %q from yaml to json: %v", schemaPath, err)
+		return nil, fmt.Errorf("failed to convert schema file at path %q from yaml to json: %v", schemaPath, err)
+	}
+	s, err := gojsonschema.NewSchema(gojsonschema.NewBytesLoader(schemaJSON))
+	if err != nil {
+		return nil, fmt.Errorf("failed to load schema at path %q: %v", schemaPath, err)
 	}
+	schemas.m[schemaPath] = s
+	return s, nil
+}
+
+// validate validates the input yaml against the given schema template.
+func validate(inputYAML []byte, schemaPath string) error {
 	confJSON, err := yaml.YAMLToJSON(inputYAML)
 	if err != nil {
 		return fmt.Errorf("failed to convert config file bytes from yaml to json: %v", err)
 	}
+	return validateJSON(confJSON, schemaPath)
+}
+
+// validateJSON validates the input JSON against the schema template at the given path.
+func validateJSON(inputJSON []byte, schemaPath string) error {
+	schema, err := loadSchema(schemaPath)
+	if err != nil {
+		return err
+	}
 
-	result, err := gojsonschema.Validate(gojsonschema.NewBytesLoader(schemaJSON), gojsonschema.NewBytesLoader(confJSON))
+	result, err := schema.Validate(gojsonschema.NewBytesLoader(inputJSON))
 	if err != nil {
 		return fmt.Errorf("failed to validate config: %v", err)
 	}
@@ -297,10 +333,13 @@ func patternPaths(projectYAMLPath string, importsList []*importsItem) ([]string,
 
 // loadGeneratedFields loads and validates generated fields from yaml file at path.
 func loadGeneratedFields(path string) (*AllGeneratedFields, error) {
-	if _, err := os.OpenFile(path, os.O_RDONLY|os.O_CREATE, 0666); err != nil {
+	// Create the file if it does not exist and read it through the same handle.
+	f, err := os.OpenFile(path, os.O_RDONLY|os.O_CREATE, 0666)
+	if err != nil {
 		return nil, fmt.Errorf("failed to create an empty generated fields file: %v\nnote: if you hit this error in a test, please create an empty generated fields file manually and add it as a test dependency", err)
 	}
-	b, err := ioutil.ReadFile(path)
+	defer f.Close()
+	b, err := ioutil.ReadAll(f)
 	if err != nil {
 		return nil, fmt.Errorf("failed to read file at path %q: %v", path, err)
 	}
@@ -329,8 +368,57 @@ func DumpGeneratedFields(generatedFields *AllGeneratedFields, path string) error
 	}
 	content := []byte("# This is an auto-generated file and should not be modified manually.\n")
 	content = append(content, b...)
-	if err := ioutil.WriteFile(path, content, 0666); err != nil {
+	if err := writeFileAtomic(path, content); err != nil {
 		return fmt.Errorf("failed to write file at path %q: %v", path, err)
 	}
 	return nil
 }
+
+// writeFileAtomic writes data to a temporary file next to path and renames it to path,
+// so an interrupted write never leaves a truncated file behind.
+// If the temporary file cannot be created, e.g. because only the file and not its directory is writable,
+// the file is written in place instead.
+func writeFileAtomic(path string, data []byte) error {
+	// Replace the file a symlink points to rather than the symlink itself.
+	if p, err := filepath.EvalSymlinks(path); err == nil {
+		path = p
+	}
+	// Keep the permissions of an existing file. The mode is set with chmod which ignores the umask,
+	// so new files must not default to a group or world writable mode.
+	mode := os.FileMode(0644)
+	fi, statErr := os.Stat(path)
+	if statErr == nil {
+		mode = fi.Mode().Perm()
+	}
+
+	f, err := ioutil.TempFile(filepath.Dir(path), "."+filepath.Base(path)+".tmp")
+	if err != nil {
+		return ioutil.WriteFile(path, data, mode)
+	}
+	defer os.Remove(f.Name())
+
+	if _, err := f.Write(data); err != nil {
+		f.Close()
+		return err
+	}
+	if err := f.Sync(); err != nil {
+		f.Close()
+		return err
+	}
+	if err := f.Close(); err != nil {
+		return err
+	}
+	if err := os.Chmod(f.Name(), mode); err != nil {
+		return err
+	}
+	// Keep the owner of an existing file, e.g. a group writable file shared by several users.
+	// This is best effort as only privileged users can change the user, so at least try to keep the group.
+	if statErr == nil {
+		if st, ok := fi.Sys().(*syscall.Stat_t); ok {
+			if err := os.Chown(f.Name(), int(st.Uid), int(st.Gid)); err != nil {
+				os.Chown(f.Name(), -1, int(st.Gid))
+			}
+		}
+	}
+	return os.Rename(f.Name(), path)
+}
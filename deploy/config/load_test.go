@@ -23,6 +23,7 @@ import (
 	"testing"
 
 	"github.com/GoogleCloudPlatform/healthcare/deploy/config"
+	"github.com/ghodss/yaml"
 	"github.com/google/go-cmp/cmp"
 )
 
@@ -184,6 +185,115 @@ projects: []
 
 }
 
+func TestDumpGeneratedFields(t *testing.T) {
+	dir, err := ioutil.TempDir("", "")
+	if err != nil {
+		t.Fatalf("ioutil.TempDir = %v", err)
+	}
+	defer os.RemoveAll(dir)
+
+	path := filepath.Join(dir, "generated_fields.yaml")
+	if err := ioutil.WriteFile(path, []byte("stale content"), 0664); err != nil {
+		t.Fatalf("ioutil.WriteFile = %v", err)
+	}
+	// Set the mode explicitly as ioutil.WriteFile applies the umask.
+	if err := os.Chmod(path, 0664); err != nil {
+		t.Fatalf("os.Chmod = %v", err)
+	}
+
+	genFields := &config.AllGeneratedFields{
+		Projects: map[string]*config.GeneratedFields{
+			"foo-project": {ProjectNumber: "123"},
+		},
+	}
+	if err := config.DumpGeneratedFields(genFields, path); err != nil {
+		t.Fatalf("config.DumpGeneratedFields = %v", err)
+	}
+
+	got, err := ioutil.ReadFile(path)
+	if err != nil {
+		t.Fatalf("ioutil.ReadFile = %v", err)
+	}
+	gotGenFields := new(config.AllGeneratedFields)
+	if err := yaml.Unmarshal(got, gotGenFields); err != nil {
+		t.Fatalf("yaml.Unmarshal = %v", err)
+	}
+	if diff := cmp.Diff(gotGenFields, genFields); diff != "" {
+		t.Errorf("generated fields differ (-got +want):\n%v", diff)
+	}
+
+	// The temporary file is renamed over the original, so nothing else is left in the directory.
+	files, err := ioutil.ReadDir(dir)
+	if err != nil {
+		t.Fatalf("ioutil.ReadDir = %v", err)
+	}
+	if len(files) != 1 {
+		t.Fatalf("got %d files in %q; want 1", len(files), dir)
+	}
+	if got, want := files[0].Mode().Perm(), os.FileMode(0664); got != want {
+		t.Errorf("mode of existing file = %v; want %v", got, want)
+	}
+}
+
+func TestDumpGeneratedFieldsReadOnlyDir(t *testing.T) {
+	dir, err := ioutil.TempDir("", "")
+	if err != nil {
+		t.Fatalf("ioutil.TempDir = %v", err)
+	}
+	defer os.RemoveAll(dir)
+
+	// Only the file itself is writable, so it has to be written in place.
+	path := filepath.Join(dir, "generated_fields.yaml")
+	if err := ioutil.WriteFile(path, []byte("stale content"), 0666); err != nil {
+		t.Fatalf("ioutil.WriteFile = %v", err)
+	}
+	if err := os.Chmod(dir, 0555); err != nil {
+		t.Fatalf("os.Chmod = %v", err)
+	}
+	defer os.Chmod(dir, 0755)
+
+	genFields := &config.AllGeneratedFields{
+		Projects: map[string]*config.GeneratedFields{
+			"foo-project": {ProjectNumber: "123"},
+		},
+	}
+	if err := config.DumpGeneratedFields(genFields, path); err != nil {
+		t.Fatalf("config.DumpGeneratedFields = %v", err)
+	}
+
+	got, err := ioutil.ReadFile(path)
+	if err != nil {
+		t.Fatalf("ioutil.ReadFile = %v", err)
+	}
+	gotGenFields := new(config.AllGeneratedFields)
+	if err := yaml.Unmarshal(got, gotGenFields); err != nil {
+		t.Fatalf("yaml.Unmarshal = %v", err)
+	}
+	if diff := cmp.Diff(gotGenFields, genFields); diff != "" {
+		t.Errorf("generated fields differ (-got +want):\n%v", diff)
+	}
+}
+
+func TestDumpGeneratedFieldsNewFile(t *testing.T) {
+	dir, err := ioutil.TempDir("", "")
+	if err != nil {
+		t.Fatalf("ioutil.TempDir = %v", err)
+	}
+	defer os.RemoveAll(dir)
+
+	path := filepath.Join(dir, "generated_fields.yaml")
+	if err := config.DumpGeneratedFields(&config.AllGeneratedFields{}, path); err != nil {
+		t.Fatalf("config.DumpGeneratedFields = %v", err)
+	}
+	fi, err := os.Stat(path)
+	if err != nil {
+		t.Fatalf("os.Stat = %v", err)
+	}
+	if got, want := fi.Mode().Perm(), os.FileMode(0644); got != want {
+		t.Errorf("mode of new file = %v; want %v", got, want)
+	}
+}
+
 func TestPattern(t *testing.T) {
 	dir, err := ioutil.TempDir("", "")
 	if err != nil {
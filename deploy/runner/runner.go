@@ -119,6 +119,8 @@ func (*Fake) CmdOutput(cmd *exec.Cmd) ([]byte, error) {
 		return []byte("[]"), nil
 	case contains(cmdStr, "compute instances list"):
 		return []byte("[]"), nil
+	case contains(cmdStr, "compute images list"):
+		return []byte("[]"), nil
 	case contains(cmdStr, "resource-manager liens list"):
 		return []byte("[]"), nil
 	case contains(cmdStr, "terraform output -json project_number"):